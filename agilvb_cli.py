@@ -0,0 +1,120 @@
+"""
+agilvb_cli.py
+-------------
+
+Command-line options shared by the AgilVB matching CLIs.
+
+``match_compra_agil.py`` and ``match_mercado_publico.py`` expose the same
+matcher tuning flags (time budget, variant clustering, similarity kernel and
+the slow-query log) and print the same slow-query summary
+at the end of a run.  Both are defined here so the help text and defaults
+stay in one place.
+
+Usage example::
+
+    from agilvb_cli import add_matcher_arguments, matcher_options, print_slow_queries
+
+    parser = argparse.ArgumentParser()
+    add_matcher_arguments(parser)
+    args = parser.parse_args()
+    matcher = PriceMatcher(price_list, **matcher_options(parser, args))
+    ...
+    print_slow_queries(matcher, args.slow_query_log)
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Any, Dict, Optional
+
+from agilvb_matcher import SIMILARITY_KERNELS, PriceMatcher
+
+
+def add_matcher_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the matcher tuning flags to ``parser``.
+
+    Adds ``--time_budget``, ``--cluster_threshold``, ``--kernel``,
+    ``--slow_query_threshold`` and ``--slow_query_log``.
+    """
+    parser.add_argument(
+        "--time_budget",
+        type=float,
+        default=0.0,
+        help=(
+            "Tiempo máximo (segundos) de búsqueda por descripción. Al agotarse se devuelven las mejores "
+            "coincidencias encontradas hasta ese momento, marcadas como parciales (columna partial). 0 = sin límite."
+        ),
+    )
+    parser.add_argument(
+        "--cluster_threshold",
+        type=float,
+        default=0.0,
+        help=(
+            "Si es > 0 (p. ej. 0.85), agrupa variantes casi idénticas del catálogo y puntúa un representante "
+            "por grupo antes de expandirlo. El ranking final no cambia; la carga es más lenta. Sin efecto con "
+            "--kernel rapidfuzz. 0 = desactivado."
+        ),
+    )
+    parser.add_argument(
+        "--kernel",
+        choices=SIMILARITY_KERNELS,
+        default="difflib",
+        help=(
+            "Implementación de la similitud base. 'rapidfuzz' (opcional) es mucho más rápida (~80x), "
+            "pero sus puntajes difieren levemente de difflib (por defecto difflib)."
+        ),
+    )
+    parser.add_argument(
+        "--slow_query_threshold",
+        type=float,
+        default=0.0,
+        help=(
+            "Si es > 0, registra cada descripción cuya búsqueda tarde al menos estos segundos (forma "
+            "normalizada, palabras clave, candidatos y tiempo por etapa). 0 = desactivado."
+        ),
+    )
+    parser.add_argument(
+        "--slow_query_log",
+        default="",
+        help=(
+            "Archivo JSON lines donde se agregan las consultas lentas de --slow_query_threshold, "
+            "para reproducirlas con replay_slow_queries.py."
+        ),
+    )
+
+
+def matcher_options(parser: argparse.ArgumentParser, args: argparse.Namespace) -> Dict[str, Any]:
+    """Return the ``PriceMatcher`` keyword arguments set by :func:`add_matcher_arguments`.
+
+    ``--time_budget`` applies per call and is not included.
+    Exits through ``parser.error`` when ``--slow_query_log`` is given without
+    ``--slow_query_threshold``, which would record nothing.
+    """
+    if args.slow_query_log and not args.slow_query_threshold:
+        parser.error("--slow_query_log requiere --slow_query_threshold (> 0)")
+    return {
+        "cluster_threshold": args.cluster_threshold or None,
+        "kernel": args.kernel,
+        "slow_query_threshold": args.slow_query_threshold or None,
+        "slow_query_log": args.slow_query_log or None,
+    }
+
+
+def print_slow_queries(matcher: PriceMatcher, log_path: Optional[str] = None, limit: int = 5) -> None:
+    """Print how many items exceeded ``--slow_query_threshold`` and the slowest ones.
+
+    The count is the log's ``total``; the slowest items are taken from the
+    records still kept in memory.  Prints nothing when slow-query logging is
+    off or no item was slow.
+    """
+    log = matcher.slow_query_log
+    if log is None or not log.total:
+        return
+    print(
+        f"{log.total} descripciones superaron --slow_query_threshold"
+        + (f" (registradas en {log_path})" if log_path else "")
+    )
+    slowest = sorted(log.entries(), key=lambda r: -r["stages_ms"]["total"])[:limit]
+    for record in slowest:
+        candidates = "en caché" if record["cached"] else f"{record['candidates']} candidatos"
+        print(f"  {record['stages_ms']['total']:8.1f} ms  {candidates:>16}  {record['description'][:80]}")
@@ -0,0 +1,261 @@
+"""
+agilvb_output.py
+----------------
+
+Incremental writers for match reports produced by the AgilVB CLIs.
+
+``DataFrame.to_excel`` builds the whole workbook in memory before saving it,
+which dominates the run time for large result sets.  The writers in this
+module instead receive the report chunk by chunk (typically one chunk per
+batch of matched descriptions) and stream each chunk to disk, so memory use
+stays bounded by the chunk size rather than by the total number of rows.
+
+Supported formats:
+
+* ``csv``     – plain CSV (UTF-8) via ``DataFrame.to_csv`` in append mode.
+* ``jsonl``   – JSON lines, one record per match.
+* ``parquet`` – Parquet via ``pyarrow.parquet.ParquetWriter`` (one row group
+  per chunk).  Requires the optional ``pyarrow`` package.
+* ``xlsx``    – Excel via openpyxl's *write-only* workbook, which streams rows
+  to a temporary file instead of keeping every cell in memory.
+
+Usage example::
+
+    from agilvb_output import open_writer
+
+    with open_writer('resultados.csv') as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    print(writer.rows_written)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional
+
+import pandas as pd
+
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet", "xlsx")
+
+_EXTENSION_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".xlsx": "xlsx",
+}
+
+
+def resolve_output_format(path: str, output_format: Optional[str] = None) -> str:
+    """Decide the output format from an explicit flag or the file extension.
+
+    Args:
+        path: Output file path.
+        output_format: Explicit format (one of ``OUTPUT_FORMATS``).  When
+            empty, the format is inferred from the extension of ``path``.
+
+    Returns:
+        The resolved format name.
+
+    Raises:
+        ValueError: If the format is unknown or cannot be inferred.
+    """
+    if output_format:
+        fmt = output_format.lower().lstrip(".")
+        if fmt == "excel":
+            fmt = "xlsx"
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'. Expected one of {list(OUTPUT_FORMATS)}")
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    fmt = _EXTENSION_FORMATS.get(ext)
+    if fmt is None:
+        raise ValueError(
+            f"Cannot infer output format from extension '{ext}'. Use one of {sorted(_EXTENSION_FORMATS)} "
+            "or pass the format explicitly."
+        )
+    return fmt
+
+
+class ResultWriter(ABC):
+    """Base class for incremental report writers.
+
+    Subclasses implement ``_write_chunk`` and optionally ``_close``.  Writers
+    are context managers; leaving the ``with`` block closes the output file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.rows_written = 0
+        self._closed = False
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, frame: pd.DataFrame) -> None:
+        """Append a chunk of rows to the output."""
+        if self._closed:
+            raise ValueError("Cannot write to a closed writer")
+        self._write_chunk(frame)
+        self.rows_written += len(frame)
+
+    def close(self) -> None:
+        """Flush and close the output file.  Safe to call more than once."""
+        if not self._closed:
+            self._closed = True
+            self._close()
+
+    @abstractmethod
+    def _write_chunk(self, frame: pd.DataFrame) -> None:
+        """Write one chunk of rows to the output file."""
+
+    def _close(self) -> None:
+        pass
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class CsvResultWriter(ResultWriter):
+    """Write chunks as CSV, emitting the header only once."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._fh = open(path, "w", encoding="utf-8", newline="")
+        self._header_written = False
+
+    def _write_chunk(self, frame: pd.DataFrame) -> None:
+        frame.to_csv(self._fh, index=False, header=not self._header_written)
+        self._header_written = True
+
+    def _close(self) -> None:
+        self._fh.close()
+
+
+class JsonLinesResultWriter(ResultWriter):
+    """Write chunks as JSON lines (one object per row, missing values as null)."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._fh = open(path, "w", encoding="utf-8")
+
+    def _write_chunk(self, frame: pd.DataFrame) -> None:
+        if frame.empty:
+            return
+        text = frame.to_json(orient="records", lines=True, force_ascii=False)
+        self._fh.write(text)
+        if not text.endswith("\n"):
+            self._fh.write("\n")
+
+    def _close(self) -> None:
+        self._fh.close()
+
+
+class ParquetResultWriter(ResultWriter):
+    """Write chunks as row groups of a single Parquet file.
+
+    The schema is fixed by the first non-empty chunk; later chunks are cast to
+    it so that, e.g., an all-null cost column does not change type mid-file.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - depends on the environment
+            raise ImportError("Parquet output requires the 'pyarrow' package (pip install pyarrow)") from exc
+        self._pa = pa
+        self._pq = pq
+        self._writer = None
+        self._schema = None
+
+    def _write_chunk(self, frame: pd.DataFrame) -> None:
+        if frame.empty:
+            return
+        table = self._pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = self._pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(table)
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ExcelResultWriter(ResultWriter):
+    """Stream chunks into a single sheet using openpyxl's write-only mode.
+
+    Write-only workbooks keep rows in a temporary file rather than in memory,
+    so the cost per row is constant.  Missing values are written as empty
+    cells, matching ``DataFrame.to_excel``.
+    """
+
+    def __init__(self, path: str, sheet_name: str = "Sheet1") -> None:
+        super().__init__(path)
+        from openpyxl import Workbook
+
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(sheet_name)
+        self._header_written = False
+
+    @staticmethod
+    def _cell(value: Any) -> Any:
+        if value is None or value is pd.NA:
+            return None
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        if hasattr(value, "item"):
+            # numpy scalar -> Python scalar
+            return value.item()
+        return value
+
+    def _write_chunk(self, frame: pd.DataFrame) -> None:
+        if not self._header_written:
+            self._ws.append([str(c) for c in frame.columns])
+            self._header_written = True
+        cell = self._cell
+        for row in frame.itertuples(index=False, name=None):
+            self._ws.append([cell(v) for v in row])
+
+    def _close(self) -> None:
+        self._wb.save(self.path)
+
+
+_WRITERS = {
+    "csv": CsvResultWriter,
+    "jsonl": JsonLinesResultWriter,
+    "parquet": ParquetResultWriter,
+    "xlsx": ExcelResultWriter,
+}
+
+
+def open_writer(path: str, output_format: Optional[str] = None) -> ResultWriter:
+    """Create the incremental writer for ``path``.
+
+    Args:
+        path: Output file path.
+        output_format: Optional explicit format; otherwise inferred from the
+            file extension (see :func:`resolve_output_format`).
+
+    Returns:
+        A :class:`ResultWriter` ready to receive chunks.
+    """
+    fmt = resolve_output_format(path, output_format)
+    return _WRITERS[fmt](path)
+
+
+def iter_chunks(values: List[Any], chunk_size: int):
+    """Yield ``(offset, slice)`` pairs of at most ``chunk_size`` elements."""
+    if chunk_size <= 0:
+        chunk_size = len(values) or 1
+    for start in range(0, len(values), chunk_size):
+        yield start, values[start:start + chunk_size]
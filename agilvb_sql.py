@@ -0,0 +1,404 @@
+"""
+agilvb_sql.py
+-------------
+
+Bulk SQL sink for match results produced by ``PriceMatcher.match_items_frame``.
+
+Instead of exporting an Excel file that is later uploaded row by row, the CLI
+can write matches straight into a database table.  Rows are sent in batches:
+
+* **PostgreSQL / Supabase** – each batch is streamed with ``COPY`` into a
+  temporary staging table and merged with a single
+  ``INSERT ... SELECT ... ON CONFLICT DO UPDATE``.  Requires ``psycopg`` (v3)
+  or ``psycopg2``.
+* **SQLite** – each batch is written with ``executemany`` and an
+  ``INSERT ... ON CONFLICT DO UPDATE`` upsert (SQLite >= 3.24).  Useful for
+  local runs and tests.
+
+Upserts are keyed by ``(batch_key, item_index, match_rank)``: ``batch_key``
+identifies the request (the CLI uses the absolute path of the input file),
+``item_index`` is the 0-based position of the description in that request
+and ``match_rank`` the 1-based rank of the match.
+
+Re-running a request replaces its previous results atomically.  Batches are
+staged under a temporary key (``STAGING_PREFIX`` + a random token); only when
+the run completes does :meth:`SqlResultSink.close` delete the rows of
+``batch_key`` and move the staged rows to it, in one transaction.  Nothing is
+duplicated, ranks or items that the new run no longer produces (e.g. a
+smaller ``top_n``) do not survive, and a run that fails part-way discards its
+staged rows and leaves the previous results untouched.  Rows left under a
+staging key by a crashed process can be removed with
+``DELETE FROM compra_agil_matches WHERE batch_key LIKE '~staging:%'``.
+
+Batches are written through a bounded connection pool (``pool_size``
+connections, at most ``pool_size`` batches in flight).  SQLite always uses a
+single connection because it allows only one writer at a time.
+
+Usage example::
+
+    from agilvb_sql import SqlResultSink
+
+    with SqlResultSink('sqlite:///resultados.db', batch_key='solicitud_123') as sink:
+        frame = matcher.match_items_frame(descriptions, top_n=3, quantities=quantities)
+        sink.write(frame)
+    print(sink.rows_written)
+
+The table layout matches ``compra_agil_matches`` in ``supabase/schema.sql``;
+``create_table=True`` (the default) creates it if it does not exist.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import queue
+import re
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, List, Sequence, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover - only for type annotations
+    import pandas as pd
+
+DEFAULT_TABLE = "compra_agil_matches"
+
+KEY_COLUMNS: Tuple[str, ...] = ("batch_key", "item_index", "match_rank")
+
+# Prefix of the temporary batch keys rows are staged under until close()
+STAGING_PREFIX = "~staging:"
+
+# Table columns and the ``match_items_frame`` column each one is taken from.
+_COLUMN_SOURCES: Tuple[Tuple[str, str], ...] = (
+    ("description", "item"),
+    ("quantity", "quantity"),
+    ("matched_product", "product"),
+    ("catalogue_row", "row_id"),
+    ("score", "score"),
+    ("net_price_unit", "net_price"),
+    ("total_price_unit", "total_price"),
+    ("net_cost_unit", "net_cost"),
+    ("net_margin_unit", "net_margin"),
+    ("margin_pct", "margin_pct"),
+    ("net_price_extended", "net_price_extended"),
+    ("total_price_extended", "total_price_extended"),
+    ("net_cost_extended", "net_cost_extended"),
+    ("net_margin_extended", "net_margin_extended"),
+    ("partial", "partial"),
+)
+
+COLUMNS: Tuple[str, ...] = KEY_COLUMNS + tuple(name for name, _ in _COLUMN_SOURCES)
+
+_SQL_TYPES = {
+    "batch_key": "TEXT NOT NULL",
+    "item_index": "INTEGER NOT NULL",
+    "match_rank": "INTEGER NOT NULL",
+    "description": "TEXT",
+    "quantity": "DOUBLE PRECISION",
+    "matched_product": "TEXT",
+    "catalogue_row": "INTEGER",
+    "partial": "BOOLEAN",
+}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+
+def _create_table_sql(table: str) -> str:
+    cols = ",\n  ".join(f"{c} {_SQL_TYPES.get(c, 'DOUBLE PRECISION')}" for c in COLUMNS)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table} (\n  {cols},\n"
+        f"  updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,\n"
+        f"  PRIMARY KEY ({', '.join(KEY_COLUMNS)})\n)"
+    )
+
+
+def _upsert_assignments(excluded: str) -> str:
+    updates = [f"{c} = {excluded}.{c}" for c in COLUMNS if c not in KEY_COLUMNS]
+    updates.append("updated_at = CURRENT_TIMESTAMP")
+    return ", ".join(updates)
+
+
+def frame_to_rows(frame: "pd.DataFrame", batch_key: str, item_offset: int = 0) -> List[Tuple[Any, ...]]:
+    """Convert a ``match_items_frame`` result into tuples ordered as ``COLUMNS``.
+
+    Missing values (NaN) become ``None``; columns absent from ``frame`` (e.g.
+    the extended totals when no quantities were given) are stored as NULL.
+
+    Args:
+        frame: DataFrame returned by ``PriceMatcher.match_items_frame``.
+        batch_key: Identifier of the request the rows belong to.
+        item_offset: Added to ``query_index`` to obtain ``item_index`` when the
+            request is matched in chunks.
+    """
+    n = len(frame)
+    data: List[Sequence[Any]] = [
+        [batch_key] * n,
+        (frame["query_index"] + item_offset).tolist(),
+        frame["match_rank"].tolist(),
+    ]
+    for _, source in _COLUMN_SOURCES:
+        if source not in frame.columns:
+            data.append([None] * n)
+            continue
+        col = frame[source]
+        values = col.astype(object).where(col.notna(), None).tolist()
+        data.append(values)
+    return list(zip(*data))
+
+
+class _ConnectionPool:
+    """A minimal thread-safe pool holding at most ``max_size`` connections."""
+
+    def __init__(self, factory: Callable[[], Any], max_size: int) -> None:
+        self._factory = factory
+        self._max_size = max(1, max_size)
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._all: List[Any] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self._max_size:
+                conn = self._factory()
+                self._all.append(conn)
+                return conn
+        return self._idle.get()
+
+    def release(self, conn: Any) -> None:
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._all.clear()
+
+
+class SqlResultSink:
+    """Write match results to SQLite or PostgreSQL in batched, idempotent upserts.
+
+    Rows are staged under a temporary key and replace the rows previously
+    stored under ``batch_key`` in a single transaction on :meth:`close`.
+    Until then, and for good if the run fails, the previous results stay as
+    they were.
+
+    Args:
+        url: ``sqlite:///path/to.db`` (``sqlite:///:memory:`` also works) or a
+            ``postgresql://`` / ``postgres://`` connection string.
+        table: Destination table (optionally ``schema.table``).
+        batch_key: Identifier of the request; part of the upsert key.
+        batch_size: Rows per bulk insert.
+        pool_size: Maximum number of database connections (and batches in
+            flight).  Forced to 1 for SQLite.
+        create_table: Create the destination table if it does not exist.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        table: str = DEFAULT_TABLE,
+        batch_key: str = "",
+        batch_size: int = 5000,
+        pool_size: int = 4,
+        create_table: bool = True,
+    ) -> None:
+        if not _IDENTIFIER.match(table):
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.url = url
+        self.table = table
+        self.batch_key = batch_key
+        self.batch_size = max(1, batch_size)
+        self.rows_written = 0
+        self._closed = False
+        self._staging_key = f"{STAGING_PREFIX}{uuid.uuid4().hex}:{batch_key}"
+
+        lowered = url.lower()
+        if lowered.startswith("sqlite://"):
+            self.dialect = "sqlite"
+            path = url[len("sqlite://"):]
+            if path.startswith("/"):
+                path = path[1:]
+            path = path or ":memory:"
+            pool_size = 1
+
+            def factory() -> Any:
+                return sqlite3.connect(path, check_same_thread=False)
+        elif lowered.startswith("postgresql://") or lowered.startswith("postgres://"):
+            self.dialect = "postgresql"
+            factory = self._postgres_factory(url)
+        else:
+            raise ValueError(f"Unsupported database URL (expected sqlite:// or postgresql://): {url}")
+
+        self.pool_size = max(1, pool_size)
+        self._pool = _ConnectionPool(factory, self.pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="agilvb-sql")
+        self._pending: List[Future] = []
+        self._count_lock = threading.Lock()
+        if create_table:
+            self._run(self._create_table)
+
+    @staticmethod
+    def _postgres_factory(url: str) -> Callable[[], Any]:
+        try:
+            import psycopg  # type: ignore
+
+            return lambda: psycopg.connect(url)
+        except ImportError:
+            pass
+        try:
+            import psycopg2  # type: ignore
+        except ImportError as exc:  # pragma: no cover - depends on the environment
+            raise ImportError("PostgreSQL output requires 'psycopg' or 'psycopg2' (pip install psycopg)") from exc
+        return lambda: psycopg2.connect(url)
+
+    # -- connection helpers -------------------------------------------------
+
+    def _run(self, fn: Callable[[Any], None]) -> None:
+        conn = self._pool.acquire()
+        try:
+            fn(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.release(conn)
+
+    def _create_table(self, conn: Any) -> None:
+        cur = conn.cursor()
+        cur.execute(_create_table_sql(self.table))
+        cur.close()
+
+    # -- bulk writes --------------------------------------------------------
+
+    def _insert_sqlite(self, conn: Any, rows: List[Tuple[Any, ...]]) -> None:
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        sql = (
+            f"INSERT INTO {self.table} ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {_upsert_assignments('excluded')}"
+        )
+        conn.executemany(sql, rows)
+
+    def _insert_postgres(self, conn: Any, rows: List[Tuple[Any, ...]]) -> None:
+        stage = "_agilvb_stage"
+        cols = ", ".join(COLUMNS)
+        keys = ", ".join(KEY_COLUMNS)
+        cur = conn.cursor()
+        cur.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {stage} "
+            f"(LIKE {self.table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        copy_sql = f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT csv)"
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        if hasattr(cur, "copy"):
+            # psycopg 3
+            with cur.copy(copy_sql) as copy:
+                copy.write(buf.getvalue())
+        else:
+            # psycopg2
+            buf.seek(0)
+            cur.copy_expert(copy_sql, buf)
+        # DISTINCT ON keeps ON CONFLICT from touching the same key twice
+        cur.execute(
+            f"INSERT INTO {self.table} ({cols}) "
+            f"SELECT DISTINCT ON ({keys}) {cols} FROM {stage} ORDER BY {keys} "
+            f"ON CONFLICT ({keys}) DO UPDATE SET {_upsert_assignments('EXCLUDED')}"
+        )
+        cur.close()
+
+    def _publish(self, conn: Any) -> None:
+        """Replace the rows of ``batch_key`` with the staged ones."""
+        placeholder = "?" if self.dialect == "sqlite" else "%s"
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM {self.table} WHERE batch_key = {placeholder}", (self.batch_key,))
+        cur.execute(
+            f"UPDATE {self.table} SET batch_key = {placeholder} WHERE batch_key = {placeholder}",
+            (self.batch_key, self._staging_key),
+        )
+        cur.close()
+
+    def _discard(self, conn: Any) -> None:
+        """Delete the staged rows, keeping the previous results."""
+        placeholder = "?" if self.dialect == "sqlite" else "%s"
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM {self.table} WHERE batch_key = {placeholder}", (self._staging_key,))
+        cur.close()
+
+    def _write_batch(self, rows: List[Tuple[Any, ...]]) -> None:
+        insert = self._insert_sqlite if self.dialect == "sqlite" else self._insert_postgres
+        self._run(lambda conn: insert(conn, rows))
+        with self._count_lock:
+            self.rows_written += len(rows)
+
+    def _drain(self, keep: int) -> None:
+        while len(self._pending) > keep:
+            self._pending.pop(0).result()
+
+    def write(self, frame: "pd.DataFrame", item_offset: int = 0) -> None:
+        """Queue the rows of a ``match_items_frame`` result for bulk upsert.
+
+        Batches are submitted to the connection pool and staged until
+        :meth:`close`; this call blocks only when ``pool_size`` batches are
+        already in flight.
+
+        Args:
+            frame: DataFrame returned by ``PriceMatcher.match_items_frame``.
+            item_offset: Position of the first description of ``frame`` in
+                the request (for chunked matching).
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed sink")
+        rows = frame_to_rows(frame, self._staging_key, item_offset)
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            self._drain(self.pool_size - 1)
+            self._pending.append(self._executor.submit(self._write_batch, batch))
+
+    def flush(self) -> None:
+        """Wait for every queued batch; re-raises the first write error."""
+        self._drain(0)
+
+    def close(self, replace: bool = True) -> None:
+        """Flush pending batches, publish or discard them and close all connections.
+
+        Args:
+            replace: Replace the rows stored under ``batch_key`` with the
+                staged ones (also when none were written: the request produced
+                no matches).  Pass False when closing after an error: the
+                staged rows are discarded and the previous results kept.  If
+                a pending batch fails, the staged rows are discarded and the
+                error re-raised.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            flushed = False
+            try:
+                self.flush()
+                flushed = True
+            finally:
+                # No batch may still be in flight when the staged rows are moved
+                self._executor.shutdown(wait=True)
+                if not (flushed and replace):
+                    self._run(self._discard)
+            if replace:
+                self._run(self._publish)
+        finally:
+            self._pool.close()
+
+    def __enter__(self) -> "SqlResultSink":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        self.close(replace=exc_type is None)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-speed evaluation of ``PriceMatcher`` performance modes.
+
+Every faster matching path (variant clusters, time budgets, ...) must be
+checked against the exhaustive ``SequenceMatcher`` baseline before it is
+enabled in production.  This script runs the same query set through the
+baseline (a ``PriceMatcher`` with default options) and through each mode
+given with ``--mode``, and prints a side-by-side report:
+
+* ``recall@1`` / ``recall@N`` – with labels (``--label_column``), the share of
+  queries whose expected product is the top match / among the top N.
+  Without labels, the baseline's results are the reference: recall@1 is
+  the share of queries whose top match equals the baseline's, recall@N the
+  mean share of the baseline's top-N products also returned by the mode.
+* ``rank_agree`` – share of queries whose ranked top-N list is identical to
+  the baseline's.
+* ``partial`` – share of queries cut short by a time budget.
+* ``ms/item`` (median per-item latency), ``p95 ms`` and ``speedup``
+  (median of the per-item baseline/mode latency ratios).
+
+Modes are comma-separated ``option=value`` lists; see ``MODE_OPTIONS``.
+
+Usage example::
+
+    python evaluate_matcher.py price_list_normalized_brand.xlsx \\
+        --input_file solicitudes.csv --description_column DESCRIPCION \\
+        --mode cluster=0.85 --mode time_budget=0.02 \\
+        --mode cluster=0.85,time_budget=0.05 --mode kernel=rapidfuzz --top_n 3
+
+Without ``--input_file`` a query set is derived from the catalogue itself:
+``--sample`` product names, each with one token dropped and the rest
+shuffled, labelled with the product they were derived from.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from agilvb_matcher import PriceMatcher, read_table
+
+# option name -> (where it applies, keyword argument, value parser)
+# ``init`` options are passed to ``PriceMatcher(...)``; ``match`` options to
+# ``PriceMatcher.match_item(...)``.
+MODE_OPTIONS: Dict[str, Tuple[str, str, Callable[[str], Any]]] = {
+    "cache": ("init", "cache_size", int),
+    "cluster": ("init", "cluster_threshold", float),
+    "kernel": ("init", "kernel", str),
+    "time_budget": ("match", "time_budget", float),
+}
+
+
+@dataclass
+class Mode:
+    """A named matcher configuration to evaluate."""
+    name: str
+    init_kwargs: Dict[str, Any] = field(default_factory=dict)
+    match_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ModeRun:
+    """Results of running a query set through one mode."""
+    products: List[List[Any]]
+    partial: List[bool]
+    seconds: List[float]
+
+
+def parse_mode(spec: str) -> Mode:
+    """Parse ``"cluster=0.85,time_budget=0.02"`` into a :class:`Mode`.
+
+    Raises:
+        ValueError: On unknown options or malformed values.
+    """
+    mode = Mode(name=spec)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if "=" not in part:
+            raise ValueError(f"Invalid mode option '{part}' (expected option=value)")
+        key, value = (x.strip() for x in part.split("=", 1))
+        if key not in MODE_OPTIONS:
+            raise ValueError(f"Unknown mode option '{key}'. Available: {sorted(MODE_OPTIONS)}")
+        target, kwarg, parse = MODE_OPTIONS[key]
+        (mode.init_kwargs if target == "init" else mode.match_kwargs)[kwarg] = parse(value)
+    return mode
+
+
+def load_queries(
+    path: str,
+    description_col: str,
+    label_col: Optional[str],
+) -> Tuple[List[str], Optional[List[str]]]:
+    """Read descriptions (and optional expected products) from Excel/CSV."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Input file not found: {path}")
+    columns = [c for c in (description_col, label_col) if c]
+    df = read_table(path, columns=columns, dtype={c: str for c in columns})
+    for col in columns:
+        if col not in df.columns:
+            available = list(read_table(path, nrows=0).columns)
+            raise ValueError(f"Column '{col}' not found in input file. Available columns: {available}")
+    df = df.dropna(subset=[description_col])
+    descriptions = df[description_col].astype(str).tolist()
+    labels = df[label_col].tolist() if label_col else None
+    return descriptions, labels
+
+
+def sample_queries(matcher: PriceMatcher, n: int, seed: int) -> Tuple[List[str], List[Any]]:
+    """Derive labelled queries from catalogue product names.
+
+    Each query is a product name with one token dropped (if it has more than
+    two) and the remaining tokens shuffled; its label is the product itself.
+    """
+    rng = random.Random(seed)
+    products = matcher._products
+    rows = rng.sample(range(len(products)), min(n, len(products)))
+    descriptions: List[str] = []
+    labels: List[Any] = []
+    for idx in rows:
+        tokens = str(products[idx]).split()
+        if len(tokens) > 2:
+            tokens.pop(rng.randrange(len(tokens)))
+        rng.shuffle(tokens)
+        descriptions.append(" ".join(tokens))
+        labels.append(products[idx])
+    return descriptions, labels
+
+
+def run_mode(matcher: PriceMatcher, descriptions: Sequence[str], top_n: int, match_kwargs: Dict[str, Any]) -> ModeRun:
+    """Match every description, timing each item separately."""
+    run = ModeRun(products=[], partial=[], seconds=[])
+    for description in descriptions:
+        start = time.perf_counter()
+        result = matcher.match_item(description, top_n=top_n, **match_kwargs)
+        run.seconds.append(time.perf_counter() - start)
+        run.products.append([m["product"] for m in result["matches"]])
+        run.partial.append(bool(result.get("partial", False)))
+    return run
+
+
+def _p95(values: Sequence[float]) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def compare(
+    baseline: ModeRun,
+    run: ModeRun,
+    labels: Optional[Sequence[Any]],
+) -> Dict[str, float]:
+    """Compute recall, rank agreement and latency figures for one mode."""
+    n = len(run.products)
+    if labels is not None:
+        recall_1 = sum(bool(p) and p[0] == label for p, label in zip(run.products, labels)) / n
+        recall_n = sum(label in p for p, label in zip(run.products, labels)) / n
+    else:
+        recall_1 = sum(
+            bool(p) and bool(b) and p[0] == b[0] for p, b in zip(run.products, baseline.products)
+        ) / n
+        shares = [
+            (len(set(b).intersection(p)) / len(set(b))) if b else 1.0
+            for p, b in zip(run.products, baseline.products)
+        ]
+        recall_n = sum(shares) / n
+    speedups = [b / r for b, r in zip(baseline.seconds, run.seconds) if r > 0]
+    return {
+        "recall@1": recall_1,
+        "recall@N": recall_n,
+        "rank_agree": sum(p == b for p, b in zip(run.products, baseline.products)) / n,
+        "partial": sum(run.partial) / n,
+        "ms/item": 1000 * statistics.median(run.seconds),
+        "p95 ms": 1000 * _p95(run.seconds),
+        "total s": sum(run.seconds),
+        "speedup": statistics.median(speedups) if speedups else float("nan"),
+    }
+
+
+def format_report(rows: List[Tuple[str, Dict[str, float]]], top_n: int) -> str:
+    """Render the report as an aligned text table."""
+    columns = ["recall@1", "recall@N", "rank_agree", "partial", "ms/item", "p95 ms", "total s", "speedup"]
+    name_width = max(len("mode"), *(len(name) for name, _ in rows))
+    header = "mode".ljust(name_width) + "".join(c.replace("@N", f"@{top_n}").rjust(12) for c in columns)
+    lines = [header, "-" * len(header)]
+    for name, metrics in rows:
+        cells = []
+        for c in columns:
+            value = metrics[c]
+            text = f"{value:.3f}" if c in ("recall@1", "recall@N", "rank_agree", "partial") else f"{value:.2f}"
+            cells.append(text.rjust(12))
+        lines.append(name.ljust(name_width) + "".join(cells))
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare PriceMatcher performance modes against the exhaustive baseline: "
+            "recall@1/@N, rank agreement and per-item speedup."
+        )
+    )
+    parser.add_argument("price_file", help="Excel/CSV price list (same format as for run_matcher.py)")
+    parser.add_argument(
+        "--input_file",
+        default="",
+        help="Excel/CSV with the queries. If omitted, queries are sampled from the catalogue.",
+    )
+    parser.add_argument(
+        "--description_column",
+        default="DESCRIPCION",
+        help="Column with the query descriptions (default: DESCRIPCION)",
+    )
+    parser.add_argument("--label_column", default="", help="Optional column with the expected product name for each query")
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=200,
+        help="Number of catalogue-derived queries when --input_file is omitted (default: 200)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for catalogue-derived queries (default: 0)")
+    parser.add_argument("--limit", type=int, default=0, help="Evaluate at most this many queries (default: all)")
+    parser.add_argument("--top_n", type=int, default=5, help="Number of matches per query (default: 5)")
+    parser.add_argument(
+        "--mode",
+        action="append",
+        default=[],
+        help=f"Mode to evaluate, e.g. 'cluster=0.85,time_budget=0.02'. Repeatable. Options: {sorted(MODE_OPTIONS)}",
+    )
+    parser.add_argument("--report_file", default="", help="Optional report output (.csv, .jsonl, .parquet or .xlsx)")
+
+    args = parser.parse_args()
+    modes = [parse_mode(spec) for spec in args.mode]
+
+    matchers: Dict[Tuple[Tuple[str, Any], ...], PriceMatcher] = {}
+
+    def matcher_for(init_kwargs: Dict[str, Any]) -> PriceMatcher:
+        # Caching is off unless a mode asks for it (``cache=N``), so repeated
+        # queries do not inflate the baseline or the other modes.
+        init_kwargs = {"cache_size": 0, **init_kwargs}
+        key = tuple(sorted(init_kwargs.items()))
+        if key not in matchers:
+            start = time.perf_counter()
+            matchers[key] = PriceMatcher(args.price_file, **init_kwargs)
+            label = ", ".join(f"{k}={v}" for k, v in key)
+            print(f"Loaded catalogue ({label}) in {time.perf_counter() - start:.2f}s")
+        return matchers[key]
+
+    baseline_matcher = matcher_for({})
+    if args.input_file:
+        descriptions, labels = load_queries(args.input_file, args.description_column, args.label_column or None)
+    else:
+        descriptions, labels = sample_queries(baseline_matcher, args.sample, args.seed)
+    if args.limit > 0:
+        descriptions = descriptions[:args.limit]
+        labels = labels[:args.limit] if labels is not None else None
+    if not descriptions:
+        print("No queries to evaluate.")
+        return
+    print(f"Evaluating {len(descriptions)} queries, top_n={args.top_n}, labels={'yes' if labels is not None else 'baseline'}")
+
+    baseline = run_mode(baseline_matcher, descriptions, args.top_n, {})
+    rows = [("baseline", compare(baseline, baseline, labels))]
+    for mode in modes:
+        run = run_mode(matcher_for(mode.init_kwargs), descriptions, args.top_n, mode.match_kwargs)
+        rows.append((mode.name, compare(baseline, run, labels)))
+
+    print()
+    print(format_report(rows, args.top_n))
+
+    if args.report_file:
+        import pandas as pd
+
+        from agilvb_output import open_writer
+
+        with open_writer(args.report_file) as writer:
+            writer.write(pd.DataFrame([{"mode": name, **metrics} for name, metrics in rows]))
+        print(f"\nReport written to {args.report_file}")
+
+
+if __name__ == "__main__":
+    main()
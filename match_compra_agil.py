@@ -4,7 +4,8 @@ match_compra_agil.py
 
 CLI para ejecutar el motor de coincidencias (PriceMatcher) con entradas
 propias de Compra Ágil. Lee un archivo Excel/CSV con al menos una columna de
-descripción y opcionalmente una columna de cantidad. Devuelve un Excel con las
+descripción y opcionalmente una columna de cantidad. Devuelve un Excel (o CSV,
+JSON lines o Parquet, según la extensión o ``--output_format``) con las
 mejores coincidencias (top‑N) incluyendo precio unitario neto, precio total con
 IVA y totales extendidos por cantidad.
 
@@ -18,17 +19,24 @@ Uso ejemplo::
         --top_n 3 \
         --output_file resultados_match_compra_agil.xlsx
 
+Con ``--sql_url`` (``sqlite:///resultados.db`` o ``postgresql://...``) los
+resultados se escriben además en la tabla ``compra_agil_matches`` mediante
+inserciones masivas idempotentes (ver ``agilvb_sql``).
+
 """
 
 from __future__ import annotations
 
 import argparse
 import os
-from typing import List, Dict, Any, Optional
+from typing import Optional
 
 import pandas as pd
 
-from agilvb_matcher import PriceMatcher
+from agilvb_cli import add_matcher_arguments, matcher_options, print_slow_queries
+from agilvb_matcher import PriceMatcher, read_table
+from agilvb_output import OUTPUT_FORMATS, iter_chunks, open_writer
+from agilvb_sql import DEFAULT_TABLE, SqlResultSink
 
 
 def read_input_file(path: str, description_col: str, quantity_col: Optional[str]) -> pd.DataFrame:
@@ -39,14 +47,12 @@ def read_input_file(path: str, description_col: str, quantity_col: Optional[str]
     """
     if not os.path.exists(path):
         raise FileNotFoundError(f"Input file not found: {path}")
-    ext = os.path.splitext(path)[1].lower()
-    if ext == ".csv":
-        df = pd.read_csv(path)
-    else:
-        df = pd.read_excel(path)
+    # Solo se leen descripción y cantidad; la descripción como texto
+    df = read_table(path, columns=[description_col, quantity_col or description_col], dtype={description_col: str})
     if description_col not in df.columns:
         raise ValueError(
-            f"Column '{description_col}' not found in input file. Available columns: {list(df.columns)}"
+            f"Column '{description_col}' not found in input file. "
+            f"Available columns: {list(read_table(path, nrows=0).columns)}"
         )
     out = pd.DataFrame({
         description_col: df[description_col].astype(str)
@@ -58,40 +64,35 @@ def read_input_file(path: str, description_col: str, quantity_col: Optional[str]
     return out
 
 
-def flatten_results(
-    results: List[Dict[str, Any]],
+def build_output_frame(
+    frame: pd.DataFrame,
     description_col: str,
     quantity_col: str,
-    quantities_by_description: Dict[str, int],
 ) -> pd.DataFrame:
-    """Aplana los resultados incluyendo cantidades y totales extendidos."""
-    rows: List[Dict[str, Any]] = []
-    for item in results:
-        description = item["item"]
-        quantity = int(quantities_by_description.get(description, 1))
-        for rank, match in enumerate(item["matches"], start=1):
-            net_unit = float(match["net_price"]) if match["net_price"] is not None else 0.0
-            total_unit = float(match["total_price"]) if match["total_price"] is not None else 0.0
-            cost_unit = float(match["net_cost"]) if match.get("net_cost") is not None else None
-            margin_unit = float(match["net_margin"]) if match.get("net_margin") is not None else None
-            margin_pct = float(match["margin_pct"]) if match.get("margin_pct") is not None else None
-            rows.append({
-                description_col: description,
-                quantity_col: quantity,
-                "match_rank": rank,
-                "matched_product": match["product"],
-                "score": match["score"],
-                "net_price_unit": net_unit,
-                "total_price_unit": total_unit,
-                "net_cost_unit": cost_unit,
-                "net_margin_unit": margin_unit,
-                "margin_pct": margin_pct,
-                "net_price_extended": net_unit * quantity,
-                "total_price_extended": total_unit * quantity,
-                "net_cost_extended": (cost_unit * quantity) if cost_unit is not None else None,
-                "net_margin_extended": (margin_unit * quantity) if margin_unit is not None else None,
-            })
-    return pd.DataFrame(rows)
+    """Convierte el resultado columnar de ``PriceMatcher.match_items_frame``
+    al formato de salida del reporte (una fila por coincidencia).
+
+    Los totales extendidos ya vienen calculados de forma vectorizada, por lo que
+    aquí sólo se renombran y ordenan columnas.  ``partial`` es True en las
+    coincidencias de descripciones que agotaron ``--time_budget``.
+    """
+    return pd.DataFrame({
+        description_col: frame["item"],
+        quantity_col: frame["quantity"].astype(int),
+        "match_rank": frame["match_rank"],
+        "matched_product": frame["product"],
+        "score": frame["score"],
+        "net_price_unit": frame["net_price"],
+        "total_price_unit": frame["total_price"],
+        "net_cost_unit": frame["net_cost"],
+        "net_margin_unit": frame["net_margin"],
+        "margin_pct": frame["margin_pct"],
+        "net_price_extended": frame["net_price_extended"],
+        "total_price_extended": frame["total_price_extended"],
+        "net_cost_extended": frame["net_cost_extended"],
+        "net_margin_extended": frame["net_margin_extended"],
+        "partial": frame["partial"],
+    })
 
 
 def main() -> None:
@@ -146,10 +147,56 @@ def main() -> None:
         default=3,
         help="Número de coincidencias a devolver por cada descripción (por defecto 3).",
     )
+    add_matcher_arguments(parser)
     parser.add_argument(
         "--output_file",
         required=True,
-        help="Ruta del archivo Excel de salida.",
+        help="Ruta del archivo de salida (.xlsx, .csv, .jsonl o .parquet).",
+    )
+    parser.add_argument(
+        "--output_format",
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help="Formato de salida. Si se omite, se infiere de la extensión de --output_file.",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=1000,
+        help="Descripciones a procesar antes de escribir cada bloque en el archivo de salida (por defecto 1000).",
+    )
+    parser.add_argument(
+        "--sql_url",
+        default="",
+        help=(
+            "Opcional: además del archivo, escribe los resultados en una base de datos "
+            "(sqlite:///ruta.db o postgresql://...). Usa inserciones masivas con upsert."
+        ),
+    )
+    parser.add_argument(
+        "--sql_table",
+        default=DEFAULT_TABLE,
+        help=f"Tabla destino para --sql_url (por defecto {DEFAULT_TABLE}).",
+    )
+    parser.add_argument(
+        "--sql_batch_key",
+        default="",
+        help=(
+            "Identificador de la solicitud en la tabla (por defecto, la ruta absoluta del archivo de entrada). "
+            "Cada ejecución reemplaza todas las filas previas de este identificador."
+        ),
+    )
+    parser.add_argument(
+        "--sql_batch_size",
+        type=int,
+        default=5000,
+        help="Filas por inserción masiva (por defecto 5000).",
+    )
+    parser.add_argument(
+        "--sql_pool_size",
+        type=int,
+        default=4,
+        help="Máximo de conexiones simultáneas a la base de datos (por defecto 4).",
     )
 
     args = parser.parse_args()
@@ -159,10 +206,7 @@ def main() -> None:
     if not descriptions:
         print("No se encontraron descripciones en el archivo de entrada.")
         return
-    quantities = {
-        row[args.description_column]: int(row[args.quantity_column])
-        for _, row in df_in.iterrows()
-    }
+    quantities = df_in.loc[df_in[args.description_column].notna(), args.quantity_column].astype(int).tolist()
 
     costs_file = args.costs_file.strip() or None
     costs_url = None if costs_file else (args.costs_url.strip() or None)
@@ -172,21 +216,47 @@ def main() -> None:
         costs_url=costs_url,
         costs_product_column=args.costs_product_column,
         costs_cost_column=args.costs_cost_column,
+        **matcher_options(parser, args),
     )
-    results = matcher.match_items(descriptions, top_n=args.top_n)
-
-    df_out = flatten_results(
-        results,
-        description_col=args.description_column,
-        quantity_col=args.quantity_column,
-        quantities_by_description=quantities,
-    )
-
-    output_dir = os.path.dirname(args.output_file)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-    df_out.to_excel(args.output_file, index=False)
-    print(f"Se han guardado {len(df_out)} filas de coincidencias en {args.output_file}")
+    sink = None
+    if args.sql_url.strip():
+        sink = SqlResultSink(
+            args.sql_url.strip(),
+            table=args.sql_table,
+            batch_key=args.sql_batch_key or os.path.abspath(args.input_file),
+            batch_size=args.sql_batch_size,
+            pool_size=args.sql_pool_size,
+        )
+    partial_items = 0
+    completed = False
+    try:
+        with open_writer(args.output_file, args.output_format) as writer:
+            for start, chunk in iter_chunks(descriptions, args.chunk_size):
+                frame = matcher.match_items_frame(
+                    chunk,
+                    top_n=args.top_n,
+                    quantities=quantities[start:start + len(chunk)],
+                    time_budget=args.time_budget or None,
+                )
+                partial_items += int(frame.loc[frame["partial"], "query_index"].nunique())
+                if sink is not None:
+                    sink.write(frame, item_offset=start)
+                writer.write(build_output_frame(
+                    frame,
+                    description_col=args.description_column,
+                    quantity_col=args.quantity_column,
+                ))
+        completed = True
+    finally:
+        if sink is not None:
+            # Tras un error se descartan las filas nuevas y se conservan las anteriores
+            sink.close(replace=completed)
+    print(f"Se han guardado {writer.rows_written} filas de coincidencias en {args.output_file}")
+    if partial_items:
+        print(f"{partial_items} descripciones agotaron --time_budget (resultados parciales)")
+    print_slow_queries(matcher, args.slow_query_log)
+    if sink is not None:
+        print(f"Se han guardado {sink.rows_written} filas en la tabla {args.sql_table}")
 
 
 if __name__ == "__main__":
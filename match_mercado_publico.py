@@ -10,9 +10,11 @@ listado de coincidencias con los precios netos y totales.
 
 El script acepta como entrada un archivo Excel o CSV con una columna de
 descripciones (por defecto "DESCRIPCION") y produce como salida un
-archivo Excel con las coincidencias. Para cada descripción se incluyen
-las mejores coincidencias (top‑N) junto con el nombre del producto, la
-similitud (0–1), el precio neto y el precio total (con IVA).
+archivo Excel (o CSV, JSON lines o Parquet) con las coincidencias. Para
+cada descripción se incluyen las mejores coincidencias (top‑N) junto con
+el nombre del producto, la similitud (0–1), el precio neto y el precio
+total (con IVA). La salida se escribe por bloques (``--chunk_size``), sin
+mantener todo el reporte en memoria.
 
 Uso ejemplo::
 
@@ -32,11 +34,13 @@ from __future__ import annotations
 
 import argparse
 import os
-from typing import List, Dict, Any
+from typing import List
 
 import pandas as pd
 
-from agilvb_matcher import PriceMatcher
+from agilvb_cli import add_matcher_arguments, matcher_options, print_slow_queries
+from agilvb_matcher import PriceMatcher, read_table
+from agilvb_output import OUTPUT_FORMATS, iter_chunks, open_writer
 
 
 def read_input_file(path: str, description_col: str) -> List[str]:
@@ -55,52 +59,41 @@ def read_input_file(path: str, description_col: str) -> List[str]:
     """
     if not os.path.exists(path):
         raise FileNotFoundError(f"Input file not found: {path}")
-    # Determine extension
-    ext = os.path.splitext(path)[1].lower()
-    if ext == ".csv":
-        df = pd.read_csv(path)
-    else:
-        # Default to Excel; load first sheet
-        df = pd.read_excel(path)
+    # Only the description column is parsed (as text); first sheet for Excel
+    df = read_table(path, columns=[description_col], dtype={description_col: str})
     if description_col not in df.columns:
         raise ValueError(
-            f"Column '{description_col}' not found in input file. Available columns: {list(df.columns)}"
+            f"Column '{description_col}' not found in input file. "
+            f"Available columns: {list(read_table(path, nrows=0).columns)}"
         )
     descriptions = df[description_col].dropna().astype(str).tolist()
     return descriptions
 
 
-def flatten_results(
-    results: List[Dict[str, Any]],
-    description_col: str,
-) -> pd.DataFrame:
-    """Transform nested match results into a flat DataFrame.
+def build_output_frame(frame: pd.DataFrame, description_col: str) -> pd.DataFrame:
+    """Rename the columnar output of ``PriceMatcher.match_items_frame``.
 
     Each row in the output corresponds to a single match for a given
-    description. If multiple matches are requested (top‑N), each rank
-    appears in una fila separada.
+    description; with top-N matching each rank appears in its own row.
 
     Args:
-        results: List of dictionaries returned by ``PriceMatcher.match_items``.
+        frame: DataFrame returned by ``PriceMatcher.match_items_frame``.
         description_col: Name to use for the original description column in the output.
 
     Returns:
         A pandas DataFrame with columns:
-            description_col, match_rank, matched_product, score, net_price, total_price
+            description_col, match_rank, matched_product, score, net_price,
+            total_price, partial (True when the item's time budget expired)
     """
-    rows: List[Dict[str, Any]] = []
-    for item in results:
-        description = item["item"]
-        for rank, match in enumerate(item["matches"], start=1):
-            rows.append({
-                description_col: description,
-                "match_rank": rank,
-                "matched_product": match["product"],
-                "score": match["score"],
-                "net_price": match["net_price"],
-                "total_price": match["total_price"],
-            })
-    return pd.DataFrame(rows)
+    return pd.DataFrame({
+        description_col: frame["item"],
+        "match_rank": frame["match_rank"],
+        "matched_product": frame["product"],
+        "score": frame["score"],
+        "net_price": frame["net_price"],
+        "total_price": frame["total_price"],
+        "partial": frame["partial"],
+    })
 
 
 def main() -> None:
@@ -127,10 +120,23 @@ def main() -> None:
         default=3,
         help="Número de coincidencias a devolver por cada descripción (por defecto 3).",
     )
+    add_matcher_arguments(parser)
     parser.add_argument(
         "--output_file",
         required=True,
-        help="Ruta del archivo Excel de salida donde se guardarán las coincidencias.",
+        help="Ruta del archivo de salida (.xlsx, .csv, .jsonl o .parquet) donde se guardarán las coincidencias.",
+    )
+    parser.add_argument(
+        "--output_format",
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help="Formato de salida. Si se omite, se infiere de la extensión de --output_file.",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=1000,
+        help="Descripciones a procesar antes de escribir cada bloque en el archivo de salida (por defecto 1000).",
     )
 
     args = parser.parse_args()
@@ -142,18 +148,25 @@ def main() -> None:
         return
 
     # Initialize matcher
-    matcher = PriceMatcher(args.price_list_file)
-    # Perform matching
-    results = matcher.match_items(descriptions, top_n=args.top_n)
-
-    # Convert to flat DataFrame and save
-    df_out = flatten_results(results, args.description_column)
-    # Ensure output directory exists
-    output_dir = os.path.dirname(args.output_file)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-    df_out.to_excel(args.output_file, index=False)
-    print(f"Se han guardado {len(df_out)} filas de coincidencias en {args.output_file}")
+    matcher = PriceMatcher(
+        args.price_list_file,
+        **matcher_options(parser, args),
+    )
+    # Perform matching chunk by chunk, streaming each block to the output file
+    partial_items = 0
+    with open_writer(args.output_file, args.output_format) as writer:
+        for _, chunk in iter_chunks(descriptions, args.chunk_size):
+            frame = matcher.match_items_frame(
+                chunk,
+                top_n=args.top_n,
+                time_budget=args.time_budget or None,
+            )
+            partial_items += int(frame.loc[frame["partial"], "query_index"].nunique())
+            writer.write(build_output_frame(frame, args.description_column))
+    print(f"Se han guardado {writer.rows_written} filas de coincidencias en {args.output_file}")
+    if partial_items:
+        print(f"{partial_items} descripciones agotaron --time_budget (resultados parciales)")
+    print_slow_queries(matcher, args.slow_query_log)
 
 
 if __name__ == "__main__":
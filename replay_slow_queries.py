@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Replay a slow-query log against a price list for profiling.
+
+``PriceMatcher(..., slow_query_threshold=..., slow_query_log=...)`` (or the
+``--slow_query_threshold``/``--slow_query_log`` flags of the matching CLIs)
+appends every item slower than the threshold to a JSON-lines log: the raw
+description, its normalized form and keywords, the number of candidates,
+whether the full catalogue was used as fallback, and the time spent in each
+stage.  This script re-runs the captured descriptions against a given price
+list and matcher configuration, so a one-off production slowdown becomes a
+reproducible benchmark case.
+
+For each record it reports the captured and replayed latency (median over
+``--repeat`` runs, caches disabled), the replayed per-stage times, the
+candidate count and fallback flag, and whether the ranked products still
+equal the captured ones (``same``).  With ``--profile`` the replay runs under
+``cProfile``; the statistics are saved to that file and the top functions by
+cumulative time are printed.
+
+Usage example::
+
+    python match_compra_agil.py --input_file solicitud.xlsx \\
+        --output_file resultados.csv --slow_query_threshold 0.5 \\
+        --slow_query_log slow_queries.jsonl
+
+    python replay_slow_queries.py slow_queries.jsonl price_list_normalized_brand.xlsx \\
+        --kernel rapidfuzz --profile replay.prof
+
+By default each record is replayed with the ``top_n`` and ``time_budget`` it
+was captured with; ``--top_n`` and ``--time_budget`` override them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+from typing import Any, Dict, List, Optional
+
+from agilvb_matcher import SIMILARITY_KERNELS, PriceMatcher, load_slow_queries
+
+STAGES = ("normalize", "candidates", "rank", "total")
+
+
+def replay_record(
+    matcher: PriceMatcher,
+    record: Dict[str, Any],
+    repeat: int,
+    top_n: Optional[int],
+    time_budget: Optional[float],
+) -> Dict[str, Any]:
+    """Re-run one captured description ``repeat`` times.
+
+    ``matcher`` must have been created with ``slow_query_threshold=0`` so that
+    every run leaves a record with its per-stage timings.
+
+    Returns:
+        A report row with the captured and median replayed timings.
+    """
+    top_n = top_n if top_n is not None else record.get("top_n", 5)
+    if time_budget is None:
+        time_budget = record.get("time_budget")
+    runs: List[Dict[str, Any]] = []
+    for _ in range(max(1, repeat)):
+        matcher.slow_query_log.clear()
+        matcher.match_item(record["description"], top_n=top_n, time_budget=time_budget or None)
+        runs.append(matcher.slow_query_log.entries()[-1])
+    last = runs[-1]
+    row: Dict[str, Any] = {
+        "description": record["description"],
+        "captured_ms": record.get("stages_ms", {}).get("total", float("nan")),
+    }
+    for stage in STAGES:
+        row[f"{stage}_ms"] = statistics.median(r["stages_ms"][stage] for r in runs)
+    row.update({
+        "candidates": last["candidates"],
+        "captured_candidates": record.get("candidates"),
+        "fallback": last["fallback"],
+        "partial": any(r["partial"] for r in runs),
+        "same": last["products"] == record.get("products"),
+    })
+    return row
+
+
+def format_report(rows: List[Dict[str, Any]], width: int = 48) -> str:
+    """Render the replay report as an aligned text table."""
+    header = (
+        "description".ljust(width)
+        + "".join(h.rjust(11) for h in ("captured", "replay", "normalize", "candidates", "rank"))
+        + "   cands fallback partial same"
+    )
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        desc = row["description"]
+        desc = desc if len(desc) <= width - 2 else desc[:width - 5] + "..."
+        cells = [row["captured_ms"], row["total_ms"], row["normalize_ms"], row["candidates_ms"], row["rank_ms"]]
+        lines.append(
+            desc.ljust(width)
+            + "".join(f"{c:11.1f}" for c in cells)
+            + f"{row['candidates']:>8}"
+            + f"{'yes' if row['fallback'] else 'no':>9}"
+            + f"{'yes' if row['partial'] else 'no':>8}"
+            + f"{'yes' if row['same'] else 'no':>5}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Replay a slow-query log (PriceMatcher slow_query_log) against a price list and matcher "
+            "configuration, reporting per-stage timings and optionally profiling."
+        )
+    )
+    parser.add_argument("log_file", help="JSON-lines slow-query log written by --slow_query_log")
+    parser.add_argument("price_file", help="Excel/CSV price list (same format as for run_matcher.py)")
+    parser.add_argument("--kernel", choices=SIMILARITY_KERNELS, default="difflib", help="Similarity kernel (default: difflib)")
+    parser.add_argument(
+        "--cluster_threshold",
+        type=float,
+        default=0.0,
+        help="Variant clustering threshold, 0 = off (default: 0)",
+    )
+    parser.add_argument("--top_n", type=int, default=0, help="Matches per query (default: as captured)")
+    parser.add_argument(
+        "--time_budget",
+        type=float,
+        default=None,
+        help="Per-item time budget in seconds, 0 = none (default: as captured)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; timings are medians (default: 3)")
+    parser.add_argument("--min_ms", type=float, default=0.0, help="Only replay records captured at or above this latency")
+    parser.add_argument("--limit", type=int, default=0, help="Replay at most this many records, slowest first (default: all)")
+    parser.add_argument("--profile", default="", help="Run the replay under cProfile and save the statistics to this file")
+    parser.add_argument("--report_file", default="", help="Optional report output (.csv, .jsonl, .parquet or .xlsx)")
+
+    args = parser.parse_args()
+
+    records = [
+        r for r in load_slow_queries(args.log_file)
+        if r.get("stages_ms", {}).get("total", 0.0) >= args.min_ms
+    ]
+    records.sort(key=lambda r: -r.get("stages_ms", {}).get("total", 0.0))
+    if args.limit > 0:
+        records = records[:args.limit]
+    if not records:
+        print("No slow queries to replay.")
+        return
+
+    # Caches are disabled so every repeat measures the full path; a threshold
+    # of 0 records every run, which is where the per-stage timings come from.
+    matcher = PriceMatcher(
+        args.price_file,
+        cluster_threshold=args.cluster_threshold or None,
+        kernel=args.kernel,
+        cache_size=0,
+        slow_query_threshold=0.0,
+    )
+    print(
+        f"Replaying {len(records)} queries x{max(1, args.repeat)} "
+        f"(kernel={args.kernel}, cluster_threshold={args.cluster_threshold or None})"
+    )
+
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    rows = [
+        replay_record(matcher, record, args.repeat, args.top_n or None, args.time_budget)
+        for record in records
+    ]
+    if profiler is not None:
+        profiler.disable()
+
+    print()
+    print(format_report(rows))
+    captured = sum(r["captured_ms"] for r in rows)
+    replayed = sum(r["total_ms"] for r in rows)
+    changed = sum(not r["same"] for r in rows)
+    print(f"\nTotal: captured {captured:.1f} ms, replay {replayed:.1f} ms; {changed} queries with different matches")
+
+    if profiler is not None:
+        import pstats
+
+        profiler.dump_stats(args.profile)
+        print(f"\nProfile written to {args.profile}\n")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+    if args.report_file:
+        import pandas as pd
+
+        from agilvb_output import open_writer
+
+        with open_writer(args.report_file) as writer:
+            writer.write(pd.DataFrame(rows))
+        print(f"Report written to {args.report_file}")
+
+
+if __name__ == "__main__":
+    main()
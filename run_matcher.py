@@ -14,6 +14,9 @@ Usage example::
 
 This will print the top three catalogue matches for each provided
 description, along with similarity scores and computed net/total prices.
+
+For quick ad-hoc lookups, pass the price list as ``.csv``: it is then read
+with the standard library and pandas is never imported.
 """
 
 import argparse
@@ -24,13 +27,13 @@ def main() -> None:
     parser = argparse.ArgumentParser(
         description=(
             "Match one or more item descriptions against a price list. "
-            "The price list must be an Excel file containing at least the "
+            "The price list must be an Excel or CSV file containing at least the "
             "columns 'PRODUCTO' and 'precio venta Neto'."
         )
     )
     parser.add_argument(
         "price_file",
-        help="Path to the Excel file containing the catalogue (e.g. Lista_de_Precios.xlsx)",
+        help="Path to the Excel or CSV file containing the catalogue (e.g. Lista_de_Precios.xlsx)",
     )
     parser.add_argument(
         "items",
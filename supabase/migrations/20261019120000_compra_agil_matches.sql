@@ -0,0 +1,29 @@
+-- Resultados del matcher de Compra Ágil (match_compra_agil.py --sql_url)
+-- Upsert idempotente por (batch_key, item_index, match_rank); las filas se escriben bajo una clave temporal (~staging:...) y al terminar la carga reemplazan en una transacción las de su batch_key
+CREATE TABLE IF NOT EXISTS compra_agil_matches (
+  batch_key TEXT NOT NULL,
+  item_index INTEGER NOT NULL,
+  match_rank INTEGER NOT NULL,
+  description TEXT,
+  quantity DOUBLE PRECISION,
+  matched_product TEXT,
+  catalogue_row INTEGER,
+  score DOUBLE PRECISION,
+  net_price_unit DOUBLE PRECISION,
+  total_price_unit DOUBLE PRECISION,
+  net_cost_unit DOUBLE PRECISION,
+  net_margin_unit DOUBLE PRECISION,
+  margin_pct DOUBLE PRECISION,
+  net_price_extended DOUBLE PRECISION,
+  total_price_extended DOUBLE PRECISION,
+  net_cost_extended DOUBLE PRECISION,
+  net_margin_extended DOUBLE PRECISION,
+  partial BOOLEAN,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (batch_key, item_index, match_rank)
+);
+
+COMMENT ON TABLE compra_agil_matches IS 'Coincidencias top-N del matcher de precios por línea de solicitud (carga masiva vía COPY)';
+COMMENT ON COLUMN compra_agil_matches.batch_key IS 'Identificador de la solicitud/lote (por defecto, ruta absoluta del archivo de entrada); cada carga reemplaza sus filas previas';
+COMMENT ON COLUMN compra_agil_matches.item_index IS 'Posición (0-based) de la descripción en la solicitud';
+COMMENT ON COLUMN compra_agil_matches.partial IS 'TRUE si la búsqueda agotó --time_budget y el ranking es parcial';
@@ -0,0 +1,306 @@
+"""Regression tests for the matcher fast paths, the SQL sink and the writers.
+
+The catalogue is a small CSV written to a temporary directory, so the tests
+run in well under a second and need neither the bundled price lists nor a
+database server.  The SQL sink tests also run against PostgreSQL when
+``AGILVB_TEST_POSTGRES_URL`` holds a connection string (they create and drop
+a uniquely named table).
+"""
+
+import os
+import sqlite3
+import uuid
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+from agilvb_cli import print_slow_queries
+from agilvb_matcher import SIMILARITY_KERNELS, LRUCache, PriceMatcher, SlowQueryLog, load_slow_queries
+from agilvb_output import OUTPUT_FORMATS, open_writer
+from agilvb_sql import DEFAULT_TABLE, SqlResultSink
+from replay_slow_queries import STAGES, replay_record
+
+POSTGRES_URL_ENV = "AGILVB_TEST_POSTGRES_URL"
+
+CATALOGUE = """PRODUCTO,precio venta Neto,MARCA
+Escritorio Sin Cajones 120x60x75 - Cedro,104166,KAIROS
+Escritorio Sin Cajones 120x60x75 - Negro,104166,KAIROS
+Escritorio Sin Cajones 140x60x75 - Cedro,119000,KAIROS
+Escritorio 2 Cajones 120x60x75 - Natural,129900,OFIMAX
+Escritorio 2 Cajones 120x60x75 - Blanco,129900,OFIMAX
+Escritorio en L 150x150x75 - Gris,189900,OFIMAX
+Cajonera Movil 3 Cajones con Llave - Negro,89900,KAIROS
+Cajonera Movil 3 Cajones con Llave - Gris,89900,KAIROS
+Gabinete Metalico 2 Puertas con Llave,159900,
+Archivero Metalico 4 Cajones,179900,OFIMAX
+Silla Ergonomica Malla Negra,79900,ERGO
+Silla Ergonomica Malla Gris,79900,ERGO
+Silla Visita Tapiz Azul,39900,
+Mesa Reunion Redonda 120 cm,149900,KAIROS
+Mesa Reunion Rectangular 180x90,189900,KAIROS
+Andador Plegable Aluminio,49900,
+Caja Archivo Carton 12 Unidades,15900,
+"""
+
+QUERIES = [
+    "ESCRITORIO 2 CAJONES COLOR NATURAL, MEDIDAS 120X59X75",
+    "CAJONERA OFICINA GABINETE CON LLAVE Y RUEDAS",
+    "SILLA ERGONOMICA MALLA KAIROS",
+    "MESA REUNION 120",
+    "ANDADOR",
+    "ZZZ QQQ",  # no keyword matches: full-catalogue fallback
+]
+
+
+@pytest.fixture
+def catalogue(tmp_path):
+    path = tmp_path / "lista.csv"
+    path.write_text(CATALOGUE, encoding="utf-8")
+    return str(path)
+
+
+def _ranked(matcher, top_n):
+    return [
+        [(m["product"], round(m["score"], 12)) for m in matcher.match_item(q, top_n=top_n)["matches"]]
+        for q in QUERIES
+    ]
+
+
+@pytest.mark.parametrize("threshold", [0.6, 0.75, 0.85])
+@pytest.mark.parametrize("top_n", [1, 3, 5])
+def test_clustered_ranking_equals_exhaustive(catalogue, threshold, top_n):
+    exhaustive = PriceMatcher(catalogue, cache_size=0)
+    clustered = PriceMatcher(catalogue, cluster_threshold=threshold, cache_size=0)
+    assert clustered._cluster_stats, "no multi-member cluster: the test would not exercise the bounds"
+    assert _ranked(clustered, top_n) == _ranked(exhaustive, top_n)
+
+
+@pytest.mark.parametrize("top_n", [1, 3, 5])
+def test_batch_kernel_scores_equal_scalar_path(catalogue, top_n):
+    pytest.importorskip("rapidfuzz")
+    matcher = PriceMatcher(catalogue, kernel="rapidfuzz", cache_size=0)
+    vectorized = [matcher._match_ranked(q, top_n, None)[0] for q in QUERIES]
+    matcher._batch_ratio = None  # force the per-candidate _compute_score loop
+    scalar = [matcher._match_ranked(q, top_n, None)[0] for q in QUERIES]
+    assert vectorized == scalar
+
+
+@pytest.mark.parametrize("kernel", SIMILARITY_KERNELS)
+def test_time_budget_marks_partial_results_and_skips_caches(catalogue, kernel):
+    if kernel == "rapidfuzz":
+        pytest.importorskip("rapidfuzz")
+    matcher = PriceMatcher(catalogue, kernel=kernel)
+    query = QUERIES[0]  # several keywords and candidates: both selection and ranking are cut short
+
+    expired = matcher.match_item(query, top_n=3, time_budget=1e-9)
+    assert expired["partial"] and expired["matches"]
+    assert matcher.match_items_frame([query], top_n=3, time_budget=1e-9)["partial"].all()
+    stats = matcher.cache_stats()
+    assert stats["candidates"]["size"] == 0 and stats["results"]["size"] == 0
+
+    exhaustive = PriceMatcher(catalogue, kernel=kernel, cache_size=0).match_item(query, top_n=3)
+    generous = matcher.match_item(query, top_n=3, time_budget=60.0)
+    assert not generous["partial"]
+    assert generous["matches"] == exhaustive["matches"]
+    assert matcher.cache_stats()["results"]["size"] == 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 1, "size": 2, "capacity": 2}
+    disabled = LRUCache(0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None and len(disabled) == 0
+
+
+def test_matcher_cache_counters_and_reload(catalogue):
+    matcher = PriceMatcher(catalogue, cache_size=2)
+    uncached = PriceMatcher(catalogue, cache_size=0)
+    for query in QUERIES[:3]:
+        matcher.match_item(query, top_n=3)
+    results = matcher.cache_stats()["results"]
+    assert (results["misses"], results["hits"], results["evictions"], results["size"]) == (3, 0, 1, 2)
+
+    assert matcher.match_item(QUERIES[2], top_n=3) == uncached.match_item(QUERIES[2], top_n=3)
+    matcher.match_item(QUERIES[0], top_n=3)  # evicted above
+    results = matcher.cache_stats()["results"]
+    assert (results["misses"], results["hits"]) == (4, 1)
+
+    matcher.reload()
+    assert all(stats["size"] == 0 for stats in matcher.cache_stats().values())
+    assert matcher.match_item(QUERIES[2], top_n=3) == uncached.match_item(QUERIES[2], top_n=3)
+
+
+def test_excel_price_list_ignores_csv_next_to_it(catalogue, tmp_path):
+    pytest.importorskip("openpyxl")
+    workbook = tmp_path / "lista.xlsx"
+    pd.read_csv(catalogue).iloc[:3].to_excel(workbook, index=False)
+    (tmp_path / "lista.csv").touch()  # newer than the workbook
+    assert len(PriceMatcher(str(workbook))) == 3
+    assert len(PriceMatcher(catalogue)) == len(CATALOGUE.splitlines()) - 1
+
+
+def test_slow_query_log_records_and_replay(catalogue, tmp_path):
+    log_path = str(tmp_path / "slow.jsonl")
+    matcher = PriceMatcher(catalogue, slow_query_threshold=0.0, slow_query_log=log_path)
+    results = matcher.match_items(QUERIES, top_n=3)
+    matcher.match_item(QUERIES[0], top_n=3)  # served from the result cache
+
+    records = load_slow_queries(log_path)
+    assert records == matcher.slow_query_log.entries()
+    assert len(records) == len(QUERIES) + 1
+    for record, result in zip(records, results):
+        assert record["description"] == result["item"]
+        assert record["products"] == [m["product"] for m in result["matches"]]
+        assert record["top_n"] == 3 and record["time_budget"] is None
+        assert record["kernel"] == "difflib" and record["price_file"] == catalogue
+        assert not record["cached"] and not record["partial"] and record["candidates"] > 0
+        assert set(record["stages_ms"]) == set(STAGES)
+        assert record["keywords"] and record["normalized"]
+    assert [r["fallback"] for r in records[:len(QUERIES)]] == [q == "ZZZ QQQ" for q in QUERIES]
+    assert records[-1]["cached"] and records[-1]["candidates"] is None
+
+    replayer = PriceMatcher(catalogue, cache_size=0, slow_query_threshold=0.0)
+    for record in records[:len(QUERIES)]:
+        row = replay_record(replayer, record, repeat=2, top_n=None, time_budget=None)
+        assert row["same"] and not row["partial"]
+        assert row["candidates"] == record["candidates"] and row["fallback"] == record["fallback"]
+        assert all(row[f"{stage}_ms"] >= 0 for stage in STAGES)
+    # Overriding top_n replays a different ranking
+    assert not replay_record(replayer, records[0], repeat=1, top_n=1, time_budget=None)["same"]
+
+
+def test_slow_query_total_counts_beyond_capacity(catalogue, capsys):
+    matcher = PriceMatcher(catalogue, cache_size=0, slow_query_threshold=0.0)
+    matcher.slow_query_log = SlowQueryLog(capacity=2)
+    matcher.match_items(QUERIES)
+    assert len(matcher.slow_query_log) == 2
+    assert matcher.slow_query_log.total == len(QUERIES)
+    print_slow_queries(matcher)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == f"{len(QUERIES)} descripciones superaron --slow_query_threshold"
+    assert len(lines) == 3
+    with pytest.raises(ValueError):
+        PriceMatcher(catalogue, slow_query_log="slow.jsonl")
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def database(request, tmp_path):
+    """``(url, table)`` of an empty results table; PostgreSQL only when configured."""
+    if request.param == "sqlite":
+        yield f"sqlite:///{tmp_path / 'r.db'}", DEFAULT_TABLE
+        return
+    url = os.environ.get(POSTGRES_URL_ENV)
+    if not url:
+        pytest.skip(f"set {POSTGRES_URL_ENV} to run the PostgreSQL tests")
+    psycopg = pytest.importorskip("psycopg")
+    table = f"agilvb_test_{uuid.uuid4().hex[:12]}"
+    yield url, table
+    with psycopg.connect(url) as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def _stored(database):
+    url, table = database
+    sql = (
+        f"SELECT batch_key, item_index, match_rank, matched_product FROM {table} "
+        "ORDER BY batch_key, item_index, match_rank"
+    )
+    if url.startswith("sqlite:///"):
+        with closing(sqlite3.connect(url[len("sqlite:///"):])) as conn:
+            return conn.execute(sql).fetchall()
+    import psycopg
+
+    with psycopg.connect(url) as conn:
+        return [tuple(r) for r in conn.execute(sql).fetchall()]
+
+
+def _write(database, frame, batch_key, batch_size=2):
+    url, table = database
+    with SqlResultSink(url, table=table, batch_key=batch_key, batch_size=batch_size, pool_size=4) as sink:
+        half = len(frame) // 2
+        sink.write(frame.iloc[:half])
+        sink.write(frame.iloc[half:])
+    return sink.rows_written
+
+
+def test_rerun_replaces_previous_rows(catalogue, database):
+    matcher = PriceMatcher(catalogue)
+    first = matcher.match_items_frame(QUERIES, top_n=3, quantities=[1] * len(QUERIES))
+    second = matcher.match_items_frame(QUERIES, top_n=2, quantities=[1] * len(QUERIES))
+
+    assert _write(database, first, "a") == len(first)
+    assert _write(database, first, "b") == len(first)
+    assert _write(database, second, "a") == len(second)
+
+    rows = _stored(database)
+    keys = [r[:3] for r in rows]
+    assert len(keys) == len(set(keys))
+    by_batch = {key: [r for r in rows if r[0] == key] for key in ("a", "b")}
+    assert len(by_batch["a"]) == len(second)
+    assert max(r[2] for r in by_batch["a"]) == 2
+    assert len(by_batch["b"]) == len(first)
+
+    # Keys repeated within one batch are upserted, not duplicated (DISTINCT ON for PostgreSQL)
+    repeated = pd.concat([first.iloc[:4], first])
+    assert len(first) >= 8  # the first half written below holds rows 0-3 twice
+    assert _write(database, repeated, "b", batch_size=len(repeated)) == len(repeated)
+    assert [r for r in _stored(database) if r[0] == "b"] == by_batch["b"]
+
+    # A run without matches still clears the batch; closing after an error does not
+    _write(database, second.iloc[:0], "b")
+    assert not [r for r in _stored(database) if r[0] == "b"]
+    sink = SqlResultSink(database[0], table=database[1], batch_key="a")
+    sink.close(replace=False)
+    assert len([r for r in _stored(database) if r[0] == "a"]) == len(second)
+
+
+def test_failed_rerun_keeps_previous_rows(catalogue, database):
+    matcher = PriceMatcher(catalogue)
+    first = matcher.match_items_frame(QUERIES, top_n=3, quantities=[1] * len(QUERIES))
+    _write(database, first, "a")
+    before = _stored(database)
+
+    with pytest.raises(RuntimeError):
+        with SqlResultSink(database[0], table=database[1], batch_key="a", batch_size=2) as sink:
+            sink.write(first.iloc[:3], item_offset=100)
+            sink.flush()
+            assert sink.rows_written == 3
+            assert [r for r in _stored(database) if r[0] == "a"] == before  # staged under another key
+            raise RuntimeError("matching failed after the first batches")
+    # Neither the staged rows nor a partial new set survive the failed run
+    assert _stored(database) == before
+
+
+def _read_back(path, fmt):
+    if fmt == "csv":
+        return pd.read_csv(path)
+    if fmt == "jsonl":
+        return pd.read_json(path, lines=True)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+
+@pytest.mark.parametrize("fmt", OUTPUT_FORMATS)
+def test_writer_round_trip(catalogue, tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    matcher = PriceMatcher(catalogue)
+    frame = matcher.match_items_frame(QUERIES, top_n=2)[["item", "match_rank", "product", "score", "net_price"]]
+    path = str(tmp_path / f"out.{fmt}")
+    with open_writer(path) as writer:
+        writer.write(frame.iloc[:3])
+        writer.write(frame.iloc[3:3])
+        writer.write(frame.iloc[3:])
+    assert writer.rows_written == len(frame)
+    pd.testing.assert_frame_equal(
+        _read_back(path, fmt), frame.reset_index(drop=True), check_dtype=False, check_exact=False
+    )